@@ -0,0 +1,113 @@
+# Startup Benchmark
+# Measures import time of main.py and time-to-first-response of a fresh uvicorn process
+# for each STARTUP_WARMUP mode.
+#
+# Usage: python benchmark_startup.py [--runs 5]
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+HEAVY_MODULES = ["jose", "cryptography", "passlib", "sqlalchemy"]
+
+IMPORT_PROBE = """
+import sys, time
+started = time.perf_counter()
+import main
+elapsed = time.perf_counter() - started
+print(elapsed)
+print(",".join(m for m in {modules!r} if m in sys.modules))
+"""
+
+
+def measure_import(runs: int):
+    timings = []
+    loaded = ""
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", IMPORT_PROBE.format(modules=HEAVY_MODULES)],
+            cwd=BACKEND_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.splitlines()
+        timings.append(float(output[0]))
+        loaded = output[1] if len(output) > 1 else ""
+    return statistics.median(timings), loaded
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def request(url: str, payload: dict = None):
+    data = json.dumps(payload).encode() if payload is not None else None
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=5) as response:
+        return response.status
+
+
+def measure_first_response(mode: str):
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, STARTUP_WARMUP=mode)
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while True:
+            try:
+                request(f"{base_url}/health")
+                break
+            except (urllib.error.URLError, ConnectionError):
+                if process.poll() is not None:
+                    raise RuntimeError(f"uvicorn exited with code {process.returncode}")
+                time.sleep(0.005)
+        ready = time.perf_counter() - started
+
+        # Register exercises email validation, password hashing and JWT signing
+        request_started = time.perf_counter()
+        request(
+            f"{base_url}/api/v1/auth/register",
+            {"email": "bench@example.com", "password": "benchmark", "role": "user"},
+        )
+        first_auth = time.perf_counter() - request_started
+        return ready, first_auth, ready + first_auth
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark backend cold start")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    import_time, loaded = measure_import(args.runs)
+    print(f"import main: {import_time * 1000:.1f} ms (median of {args.runs})")
+    print(f"heavy modules loaded at import: {loaded or 'none'}")
+    print()
+    print(f"{'mode':<12}{'/health ready':>16}{'first register':>18}{'total':>12}")
+    for mode in ["off", "background", "blocking"]:
+        results = [measure_first_response(mode) for _ in range(args.runs)]
+        ready, first_auth, total = (statistics.median(column) for column in zip(*results))
+        print(f"{mode:<12}{ready * 1000:>13.1f} ms{first_auth * 1000:>15.1f} ms{total * 1000:>9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
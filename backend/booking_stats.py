@@ -0,0 +1,120 @@
+# Trainer Booking Aggregates
+# Per-trainer, per-day booking counts maintained incrementally on booking create and
+# status change, so dashboard range queries cost O(days with bookings) instead of
+# scanning every booking.
+
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+
+
+def _key(value) -> str:
+    # Enum members (BookingStatus, SessionMode) are stored by value
+    return getattr(value, "value", value)
+
+
+def _day(scheduled_at: datetime) -> date:
+    # Naive datetimes are already UTC (the API uses utcnow()); aware ones are converted
+    if scheduled_at.utcoffset() is not None:
+        scheduled_at = scheduled_at.astimezone(timezone.utc)
+    return scheduled_at.date()
+
+
+def align_range(start: date, end: date, granularity: str = "day") -> Tuple[date, date]:
+    """Widen a week-granularity range to whole weeks (Monday through Sunday)."""
+    if granularity == "week":
+        start = start - timedelta(days=start.weekday())
+        end = end + timedelta(days=6 - end.weekday())
+    return start, end
+
+
+class DayBucket:
+    """Booking counts for one trainer on one day, keyed by (status, session_mode)."""
+
+    __slots__ = ("counts", "total")
+
+    def __init__(self):
+        self.counts: Dict[Tuple[str, str], int] = defaultdict(int)
+        self.total = 0
+
+    def add(self, status: str, mode: str, delta: int):
+        self.counts[(status, mode)] += delta
+        if self.counts[(status, mode)] == 0:
+            del self.counts[(status, mode)]
+        self.total += delta
+
+
+class TrainerBookingStats:
+    def __init__(self):
+        # trainer_id -> day -> bucket, plus the bucket days kept sorted for range lookups
+        self.buckets: Dict[str, Dict[date, DayBucket]] = defaultdict(dict)
+        self.days: Dict[str, List[date]] = defaultdict(list)
+
+    def _apply(self, trainer_id: str, day: date, status: str, mode: str, delta: int):
+        trainer_buckets = self.buckets[trainer_id]
+        bucket = trainer_buckets.get(day)
+        if bucket is None:
+            bucket = trainer_buckets[day] = DayBucket()
+            insort(self.days[trainer_id], day)
+
+        bucket.add(status, mode, delta)
+
+        if bucket.total == 0:
+            del trainer_buckets[day]
+            days = self.days[trainer_id]
+            del days[bisect_left(days, day)]
+
+    def record_created(self, booking: dict):
+        self._apply(
+            booking["trainer_id"],
+            _day(booking["scheduled_at"]),
+            _key(booking["status"]),
+            _key(booking["session_mode"]),
+            1,
+        )
+
+    def record_status_change(self, booking: dict, old_status):
+        if _key(old_status) == _key(booking["status"]):
+            return
+        trainer_id = booking["trainer_id"]
+        day = _day(booking["scheduled_at"])
+        mode = _key(booking["session_mode"])
+        self._apply(trainer_id, day, _key(booking["status"]), mode, 1)
+        self._apply(trainer_id, day, _key(old_status), mode, -1)
+
+    def query(self, trainer_ids: List[str], start: date, end: date, granularity: str = "day") -> List[dict]:
+        """Counts per day (or per ISO week, starting Monday) in the inclusive range [start, end].
+
+        For weeks the range is first widened by `align_range`, so edge weeks are complete.
+        """
+        start, end = align_range(start, end, granularity)
+        merged: Dict[date, DayBucket] = {}
+        for trainer_id in trainer_ids:
+            days = self.days.get(trainer_id)
+            if not days:
+                continue
+            trainer_buckets = self.buckets[trainer_id]
+            for day in days[bisect_left(days, start):bisect_right(days, end)]:
+                period = day - timedelta(days=day.weekday()) if granularity == "week" else day
+                target = merged.get(period)
+                if target is None:
+                    target = merged[period] = DayBucket()
+                for (status, mode), count in trainer_buckets[day].counts.items():
+                    target.add(status, mode, count)
+
+        results = []
+        for period in sorted(merged):
+            bucket = merged[period]
+            by_status: Dict[str, int] = defaultdict(int)
+            by_mode: Dict[str, int] = defaultdict(int)
+            for (status, mode), count in bucket.counts.items():
+                by_status[status] += count
+                by_mode[mode] += count
+            results.append({
+                "period_start": period,
+                "total": bucket.total,
+                "by_status": dict(by_status),
+                "by_session_mode": dict(by_mode),
+            })
+        return results
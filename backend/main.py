@@ -2,13 +2,10 @@
 # Note: This is a complete backend structure that requires installation of dependencies
 # In a production environment, run: pip install -r requirements.txt
 
-from fastapi import FastAPI, HTTPException, Depends, status, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Depends, status, Request, WebSocket, WebSocketDisconnect
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
-import uvicorn
-from datetime import datetime, timedelta
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from datetime import date, datetime, timedelta
 import os
 from typing import List, Optional, Dict, Set
 from collections import defaultdict
@@ -18,15 +15,67 @@ import uuid
 from pydantic import BaseModel, EmailStr
 from enum import Enum
 
+from booking_stats import TrainerBookingStats, align_range
+from startup import Lazy, create_lifespan
+
+from rate_limit import (
+    ConcurrencyLimiter,
+    LoadSheddingMiddleware,
+    LOGIN_FAILURES_PER_ACCOUNT,
+    LOGIN_PER_IP,
+    REGISTER_PER_IP,
+    TrustedProxies,
+    WS_NOTIFY_PER_USER,
+    create_rate_limiter,
+    retry_after_header,
+)
+
+# Heavy dependencies, imported on first use (see startup.py)
+def _load_jose():
+    from jose import JWTError, jwt
+    return jwt, JWTError
+
+def _load_pwd_context():
+    from passlib.context import CryptContext
+    # Use pbkdf2_sha256 to avoid platform-specific C extension issues with bcrypt on Windows
+    return CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+
+jose_jwt = Lazy(_load_jose)
+pwd_context = Lazy(_load_pwd_context)
+
+# Startup warm-up tasks, run from the lifespan hook
+def _warm_auth(app):
+    jose_jwt.get()
+    pwd_context.get().handler()
+
+def _warm_database(app):
+    # Only when a real database is configured; main.py still uses in-memory storage
+    if os.getenv("DATABASE_URL"):
+        from database import warm_up_pool
+        warm_up_pool()
+
+WARMUP_TASKS = [
+    ("auth", _warm_auth),
+    ("database", _warm_database),
+]
+
 # Initialize FastAPI app
 app = FastAPI(
     title="TherapyConnect API",
     description="Counseling and Life-Coaching Platform API",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=create_lifespan(WARMUP_TASKS)
 )
 
+# Rate limiting and load shedding
+# Added before CORS so that shed (503) responses still carry CORS headers
+rate_limiter = create_rate_limiter()
+concurrency_limiter = ConcurrencyLimiter()
+trusted_proxies = TrustedProxies()
+app.add_middleware(LoadSheddingMiddleware, limiter=concurrency_limiter)
+
 # CORS Configuration
 app.add_middleware(
     CORSMiddleware,
@@ -42,8 +91,6 @@ app.add_middleware(
 
 # Security
 security = HTTPBearer()
-# Use pbkdf2_sha256 to avoid platform-specific C extension issues with bcrypt on Windows
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
@@ -126,18 +173,25 @@ class EmergencyRequest(BaseModel):
     alternative_trainers: Optional[List[str]] = None
     new_schedule: Optional[datetime] = None
 
+class DashboardGranularity(str, Enum):
+    DAY = "day"
+    WEEK = "week"
+
 # In-memory storage (replace with actual database in production)
 users_db = {}
 trainers_db = {}
 bookings_db = {}
 feedback_db = {}
 
+# Per-trainer, per-day booking counts, kept in sync with bookings_db
+booking_stats = TrainerBookingStats()
+
 # Utility Functions
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return pwd_context.get().hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return pwd_context.get().verify(plain_password, hashed_password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -146,20 +200,21 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
+    jwt, _ = jose_jwt.get()
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+def decode_access_token(token: str) -> Optional[dict]:
+    jwt, JWTError = jose_jwt.get()
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Could not validate credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except JWTError:
+        return None
+
+def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    payload = decode_access_token(credentials.credentials)
+    user_id: Optional[str] = payload.get("sub") if payload else None
+    if user_id is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
@@ -175,6 +230,18 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
         )
     return user
 
+async def enforce_rate_limit(rule, identity: str, peek: bool = False):
+    allowed, retry_after = await rate_limiter.hit(rule, identity, peek=peek)
+    if not allowed:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests, please try again later",
+            headers={"Retry-After": retry_after_header(retry_after)},
+        )
+
+def client_ip(request: Request) -> str:
+    return trusted_proxies.client_ip(request)
+
 # WebSocket Manager for real-time notifications
 class ConnectionManager:
     def __init__(self):
@@ -241,7 +308,9 @@ async def health_check():
 
 # Authentication Routes
 @app.post("/api/v1/auth/register")
-async def register(user_data: UserCreate):
+async def register(user_data: UserCreate, request: Request):
+    await enforce_rate_limit(REGISTER_PER_IP, client_ip(request))
+
     if user_data.email in [u.get("email") for u in users_db.values()]:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -274,10 +343,18 @@ async def register(user_data: UserCreate):
     }
 
 @app.post("/api/v1/auth/login")
-async def login(login_data: UserLogin):
+async def login(login_data: UserLogin, request: Request):
+    ip = client_ip(request)
+    await enforce_rate_limit(LOGIN_PER_IP, ip)
+    # Failed attempts are also limited per account, keyed with the client IP so
+    # guesses from elsewhere can't lock the owner out of their own address
+    account_key = f"{login_data.email.strip().lower()}|{ip}"
+    await enforce_rate_limit(LOGIN_FAILURES_PER_ACCOUNT, account_key, peek=True)
+
     user = next((u for u in users_db.values() if u["email"] == login_data.email), None)
     
     if not user or not verify_password(login_data.password, user["password"]):
+        await rate_limiter.hit(LOGIN_FAILURES_PER_ACCOUNT, account_key)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -327,6 +404,38 @@ async def list_trainers(skip: int = 0, limit: int = 10):
     trainers = list(trainers_db.values())[skip: skip + limit]
     return {"trainers": trainers, "total": len(trainers_db)}
 
+@app.get("/api/v1/trainers/me/dashboard")
+async def get_trainer_dashboard(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    granularity: DashboardGranularity = DashboardGranularity.DAY,
+    current_user=Depends(get_current_user)
+):
+    if current_user["role"] != UserRole.TRAINER:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only trainers can access this endpoint"
+        )
+
+    today = datetime.utcnow().date()
+    start = start or today - timedelta(days=30)
+    end = end or today + timedelta(days=30)
+    if start > end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start must not be after end"
+        )
+    # Weekly buckets cover whole weeks, so report the widened range
+    start, end = align_range(start, end, granularity.value)
+
+    trainer_ids = [t["id"] for t in trainers_db.values() if t["user_id"] == current_user["id"]]
+    return {
+        "start": start,
+        "end": end,
+        "granularity": granularity,
+        "buckets": booking_stats.query(trainer_ids, start, end, granularity.value)
+    }
+
 @app.get("/api/v1/trainers/{trainer_id}")
 async def get_trainer(trainer_id: str):
     trainer = trainers_db.get(trainer_id)
@@ -359,6 +468,7 @@ async def create_booking(
     }
     
     bookings_db[booking_id] = booking
+    booking_stats.record_created(booking)
     
     # Send notification to trainer (WebSocket)
     await manager.broadcast(f"New booking request: {booking_id}")
@@ -426,7 +536,9 @@ async def emergency_notify(
         }
     elif emergency_data.preferred_action == "reschedule":
         # Update booking status
+        old_status = booking["status"]
         booking["status"] = BookingStatus.RESCHEDULED
+        booking_stats.record_status_change(booking, old_status)
         return {"message": "Booking rescheduled successfully"}
     
     return {"message": "Emergency request processed"}
@@ -460,23 +572,36 @@ async def get_loyalty_points(current_user=Depends(get_current_user)):
         "benefits_available": ["priority_booking", "discount_10"]
     }
 
+# Admin Routes
+@app.get("/api/v1/admin/rate-limits")
+async def get_rate_limit_stats(current_user=Depends(get_current_user)):
+    if current_user["role"] != UserRole.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can access this endpoint"
+        )
+    return {
+        "rate_limits": rate_limiter.stats(),
+        "concurrency": concurrency_limiter.stats()
+    }
+
 # WebSocket for real-time notifications
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket, token: str = None):
     client_id = str(uuid.uuid4())
     user_id = None
+    client_host = trusted_proxies.client_ip(websocket)
     
     # Authenticate if token is provided
     if token:
-        try:
-            # Remove 'Bearer ' prefix if present
-            if token.startswith('Bearer '):
-                token = token[7:]
-            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-            user_id = payload.get("sub")
-        except JWTError:
+        # Remove 'Bearer ' prefix if present
+        if token.startswith('Bearer '):
+            token = token[7:]
+        payload = decode_access_token(token)
+        if payload is None:
             await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
             return
+        user_id = payload.get("sub")
     
     # Connect the WebSocket
     await manager.connect(websocket, client_id)
@@ -500,6 +625,21 @@ async def websocket_endpoint(websocket: WebSocket, token: str = None):
                 pass
                 
             elif message_type == 'send_notification':
+                # Anonymous sockets share a bucket per IP
+                allowed, retry_after = await rate_limiter.hit(
+                    WS_NOTIFY_PER_USER, user_id or f"ip:{client_host}"
+                )
+                if not allowed:
+                    await websocket.send_json({
+                        'type': 'error',
+                        'data': {
+                            'code': 'rate_limited',
+                            'message': 'Too many notifications, slow down',
+                            'retryAfter': retry_after_header(retry_after)
+                        }
+                    })
+                    continue
+
                 notification_data = data.get('data', {})
                 target_user_id = notification_data.get('userId')
                 
@@ -532,6 +672,8 @@ async def websocket_endpoint(websocket: WebSocket, token: str = None):
         manager.disconnect(websocket)
 
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
@@ -0,0 +1,379 @@
+# Rate Limiting and Load Shedding
+# Per-user / per-IP token buckets plus a global, priority-aware concurrency limiter.
+# The in-memory backend is used by default; set RATE_LIMIT_BACKEND=redis (and REDIS_URL)
+# to share buckets between instances. Requires the `redis` package for that mode.
+
+import ipaddress
+import math
+import os
+import time
+from collections import defaultdict
+from enum import IntEnum
+from typing import Callable, Dict, Optional, Tuple
+
+# Limiter Settings
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+RATE_LIMIT_TTL_SECONDS = float(os.getenv("RATE_LIMIT_TTL_SECONDS", "600"))
+MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS", "100"))
+# Comma-separated proxy IPs/CIDRs allowed to set X-Forwarded-For, or "*" to trust the
+# immediate peer whatever its address (e.g. Render's load balancer)
+TRUSTED_PROXIES = os.getenv("TRUSTED_PROXIES", "")
+# Minimum seconds between backend error log lines; the rest only bump the counter
+BACKEND_ERROR_LOG_INTERVAL = 60.0
+
+
+class RateLimitRule:
+    """A named bucket shape: `rate` tokens refilled per second, up to `burst`."""
+
+    __slots__ = ("name", "rate", "burst")
+
+    def __init__(self, name: str, rate: float, burst: int):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+
+
+# Named rules used by the API routes
+LOGIN_PER_IP = RateLimitRule("login_ip", rate=5 / 60, burst=10)
+# Failed logins per (account, client IP); only charged when the password is wrong
+LOGIN_FAILURES_PER_ACCOUNT = RateLimitRule("login_account_failures", rate=1 / 60, burst=10)
+REGISTER_PER_IP = RateLimitRule("register_ip", rate=3 / 60, burst=5)
+WS_NOTIFY_PER_USER = RateLimitRule("ws_notify_user", rate=2.0, burst=20)
+
+RULES = [LOGIN_PER_IP, LOGIN_FAILURES_PER_ACCOUNT, REGISTER_PER_IP, WS_NOTIFY_PER_USER]
+
+
+def safe_ttl(ttl: float, rules=RULES) -> float:
+    """Raise `ttl` to the longest refill time among `rules`.
+
+    A bucket idle for `burst / rate` seconds is full again, so dropping it after
+    that is lossless; a shorter TTL would silently reset throttled buckets.
+    """
+    refill = max((rule.burst / rule.rate for rule in rules), default=0.0)
+    if ttl < refill:
+        print(f"RATE_LIMIT_TTL_SECONDS={ttl:g} is shorter than the {refill:g}s refill window; using {refill:g}")
+        return refill
+    return ttl
+
+
+class RateLimitCounters:
+    """Plain counters exposed through the admin metrics endpoint."""
+
+    def __init__(self):
+        self.allowed: Dict[str, int] = defaultdict(int)
+        self.limited: Dict[str, int] = defaultdict(int)
+        self.backend_errors = 0
+
+    def snapshot(self) -> dict:
+        return {
+            "allowed": dict(self.allowed),
+            "limited": dict(self.limited),
+            "backend_errors": self.backend_errors,
+        }
+
+
+# Backends
+class RateLimitBackend:
+    """Interface for token bucket storage.
+
+    `consume` returns `(allowed, retry_after_seconds)`. With `peek=True` it only
+    reports whether `cost` tokens are available and spends nothing.
+    """
+
+    async def consume(self, key: str, rule: RateLimitRule, cost: float = 1.0,
+                      peek: bool = False) -> Tuple[bool, float]:
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {}
+
+
+class InMemoryBackend(RateLimitBackend):
+    """Token buckets held in a single dict of `key -> (tokens, last_seen)`.
+
+    Entries are re-inserted on every touch, so dict order is least-recently-used
+    first. Expired entries are dropped from the front in O(expired), and the
+    table is capped at `max_keys`. The TTL is clamped by `safe_ttl`, so an
+    expired bucket would have refilled completely anyway.
+    """
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS, ttl: float = RATE_LIMIT_TTL_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_keys = max_keys
+        self.ttl = safe_ttl(ttl)
+        self.clock = clock
+        self.buckets: Dict[str, Tuple[float, float]] = {}
+        self.evicted = 0
+
+    async def consume(self, key: str, rule: RateLimitRule, cost: float = 1.0,
+                      peek: bool = False) -> Tuple[bool, float]:
+        now = self.clock()
+        entry = self.buckets.pop(key, None)
+        if entry is None:
+            tokens = float(rule.burst)
+        else:
+            tokens = min(rule.burst, entry[0] + (now - entry[1]) * rule.rate)
+
+        if tokens >= cost:
+            if not peek:
+                tokens -= cost
+            allowed, retry_after = True, 0.0
+        else:
+            allowed, retry_after = False, (cost - tokens) / rule.rate
+
+        self.buckets[key] = (tokens, now)
+        self._evict(now)
+        return allowed, retry_after
+
+    def _evict(self, now: float):
+        buckets = self.buckets
+        cutoff = now - self.ttl
+        while buckets:
+            oldest = next(iter(buckets))
+            if buckets[oldest][1] >= cutoff and len(buckets) <= self.max_keys:
+                break
+            del buckets[oldest]
+            self.evicted += 1
+
+    def stats(self) -> dict:
+        return {"tracked_keys": len(self.buckets), "evicted": self.evicted}
+
+
+class RedisBackend(RateLimitBackend):
+    """Token buckets shared between instances, refilled atomically in a Lua script."""
+
+    SCRIPT = """
+    local tokens = tonumber(redis.call('HGET', KEYS[1], 't'))
+    local stamp = tonumber(redis.call('HGET', KEYS[1], 's'))
+    local rate = tonumber(ARGV[1])
+    local burst = tonumber(ARGV[2])
+    local cost = tonumber(ARGV[3])
+    local now = tonumber(ARGV[4])
+    local ttl = tonumber(ARGV[5])
+    local peek = ARGV[6] == '1'
+    if tokens == nil then
+        tokens = burst
+    else
+        tokens = math.min(burst, tokens + (now - stamp) * rate)
+    end
+    local allowed = 0
+    local retry_after = 0
+    if tokens >= cost then
+        if not peek then
+            tokens = tokens - cost
+        end
+        allowed = 1
+    else
+        retry_after = (cost - tokens) / rate
+    end
+    redis.call('HSET', KEYS[1], 't', tokens, 's', now)
+    redis.call('EXPIRE', KEYS[1], ttl)
+    return {allowed, tostring(retry_after)}
+    """
+
+    def __init__(self, url: str = REDIS_URL, ttl: float = RATE_LIMIT_TTL_SECONDS):
+        import redis.asyncio as redis_asyncio
+
+        self.client = redis_asyncio.from_url(url)
+        self.ttl = math.ceil(safe_ttl(ttl))
+        self.script = self.client.register_script(self.SCRIPT)
+
+    async def consume(self, key: str, rule: RateLimitRule, cost: float = 1.0,
+                      peek: bool = False) -> Tuple[bool, float]:
+        allowed, retry_after = await self.script(
+            keys=[f"ratelimit:{key}"],
+            args=[rule.rate, rule.burst, cost, time.time(), self.ttl, int(peek)],
+        )
+        return bool(allowed), float(retry_after)
+
+
+class RateLimiter:
+    """Front door for the routes: applies a rule to a key and records counters."""
+
+    def __init__(self, backend: Optional[RateLimitBackend] = None):
+        self.counters = RateLimitCounters()
+        self.backend = backend or InMemoryBackend()
+        self.last_error_logged: Optional[float] = None
+
+    async def hit(self, rule: RateLimitRule, identity: str, cost: float = 1.0,
+                  peek: bool = False) -> Tuple[bool, float]:
+        try:
+            allowed, retry_after = await self.backend.consume(f"{rule.name}:{identity}", rule, cost, peek)
+        except Exception as e:
+            # Fail open: a broken shared store must not lock everyone out
+            self.counters.backend_errors += 1
+            now = time.monotonic()
+            if self.last_error_logged is None or now - self.last_error_logged >= BACKEND_ERROR_LOG_INTERVAL:
+                self.last_error_logged = now
+                print(f"Rate limit backend error ({self.counters.backend_errors} so far): {e}")
+            return True, 0.0
+
+        if allowed:
+            # A peek is followed by a real hit when it matters; count that one
+            if not peek:
+                self.counters.allowed[rule.name] += 1
+        else:
+            self.counters.limited[rule.name] += 1
+        return allowed, retry_after
+
+    def stats(self) -> dict:
+        stats = self.counters.snapshot()
+        stats["backend"] = type(self.backend).__name__
+        stats.update(self.backend.stats())
+        return stats
+
+
+def create_rate_limiter() -> RateLimiter:
+    if RATE_LIMIT_BACKEND == "redis":
+        return RateLimiter(RedisBackend())
+    return RateLimiter()
+
+
+# Load Shedding
+class Priority(IntEnum):
+    LOW = 0
+    NORMAL = 1
+    CRITICAL = 2
+
+
+# Path prefixes checked in order; anything unmatched is NORMAL
+ROUTE_PRIORITIES = [
+    ("/api/v1/emergency", Priority.CRITICAL),
+    ("/api/v1/bookings/create", Priority.CRITICAL),
+    ("/health", Priority.CRITICAL),
+    ("/api/v1/trainers/list", Priority.LOW),
+    ("/api/v1/ai/recommendations", Priority.LOW),
+]
+
+# Fraction of MAX_CONCURRENT_REQUESTS each priority may fill before it is shed
+PRIORITY_HEADROOM = {
+    Priority.LOW: 0.5,
+    Priority.NORMAL: 0.85,
+    Priority.CRITICAL: 1.0,
+}
+
+
+def route_priority(path: str) -> Priority:
+    for prefix, priority in ROUTE_PRIORITIES:
+        if path.startswith(prefix):
+            return priority
+    return Priority.NORMAL
+
+
+class ConcurrencyLimiter:
+    """Global in-flight request counter with per-priority admission thresholds.
+
+    Low-priority traffic is refused first as the server fills up, so emergency
+    and booking requests keep a reserved slice of capacity under overload.
+    """
+
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT_REQUESTS):
+        self.max_concurrent = max_concurrent
+        self.limits = {
+            priority: max(1, int(max_concurrent * share))
+            for priority, share in PRIORITY_HEADROOM.items()
+        }
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.admitted: Dict[str, int] = defaultdict(int)
+        self.shed: Dict[str, int] = defaultdict(int)
+
+    def try_acquire(self, priority: Priority) -> bool:
+        # Runs on the event loop thread, so check-and-increment needs no lock
+        if self.in_flight >= self.limits[priority]:
+            self.shed[priority.name.lower()] += 1
+            return False
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        self.admitted[priority.name.lower()] += 1
+        return True
+
+    def release(self):
+        self.in_flight -= 1
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "limits": {p.name.lower(): limit for p, limit in self.limits.items()},
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "admitted": dict(self.admitted),
+            "shed": dict(self.shed),
+        }
+
+
+class LoadSheddingMiddleware:
+    """ASGI middleware that answers 503 when a request's priority has no capacity left."""
+
+    def __init__(self, app, limiter: ConcurrencyLimiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if not self.limiter.try_acquire(route_priority(scope["path"])):
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"retry-after", b"1"),
+                ],
+            })
+            await send({
+                "type": "http.response.body",
+                "body": b'{"detail":"Server is busy, please retry shortly"}',
+            })
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.limiter.release()
+
+
+# Client Address
+class TrustedProxies:
+    """Resolves the real client address from X-Forwarded-For behind trusted proxies.
+
+    X-Forwarded-For is only read when the immediate peer is trusted. The header is
+    then walked right to left, skipping trusted proxy hops, and the first untrusted
+    address is the client. With "*" only the peer itself is trusted, so the
+    rightmost entry (the one our proxy appended) is used.
+    """
+
+    def __init__(self, spec: str = TRUSTED_PROXIES):
+        entries = [entry.strip() for entry in spec.split(",") if entry.strip()]
+        self.trust_any_peer = "*" in entries
+        self.networks = [ipaddress.ip_network(entry, strict=False) for entry in entries if entry != "*"]
+
+    def _is_proxy(self, host: str) -> bool:
+        try:
+            address = ipaddress.ip_address(host)
+        except ValueError:
+            return False
+        return any(address in network for network in self.networks)
+
+    def client_ip(self, connection) -> str:
+        """`connection` is a Starlette Request or WebSocket."""
+        peer = connection.client.host if connection.client else "unknown"
+        if not (self.trust_any_peer or self._is_proxy(peer)):
+            return peer
+
+        forwarded = connection.headers.get("x-forwarded-for")
+        if not forwarded:
+            return peer
+        hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+        for hop in reversed(hops):
+            if not self._is_proxy(hop):
+                return hop
+        return hops[0] if hops else peer
+
+
+def retry_after_header(retry_after: float) -> str:
+    return str(max(1, int(retry_after + 0.999)))
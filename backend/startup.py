@@ -0,0 +1,90 @@
+# Startup Optimization
+# Heavy dependencies (python-jose/cryptography, passlib, SQLAlchemy) are
+# imported on first use instead of at module import, and warmed up from the FastAPI
+# lifespan hook so the first real request does not pay for them.
+#
+# STARTUP_WARMUP controls the lifespan hook:
+#   blocking   - finish warm-up before the server accepts connections (default)
+#   background - warm up in a worker thread STARTUP_WARMUP_DELAY seconds after the
+#                lifespan hook returns; there is no readiness signal, so with the
+#                default delay of 0 it can still overlap uvicorn binding its socket.
+#                Only pays off when the first request arrives after warm-up has
+#                finished, otherwise that request waits on the same work
+#   off        - no warm-up, everything initializes on first use
+#
+# Measure with benchmark_startup.py before changing the default.
+
+import asyncio
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, List, Tuple
+
+WARMUP_MODES = ("blocking", "background", "off")
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "blocking")
+STARTUP_WARMUP_DELAY = float(os.getenv("STARTUP_WARMUP_DELAY", "0"))
+
+# Filled in by run_warmup: task name -> seconds taken
+warmup_timings: Dict[str, float] = {}
+
+
+class Lazy:
+    """Builds a value with `factory` on first `get()` and caches it (thread-safe)."""
+
+    def __init__(self, factory: Callable):
+        self.factory = factory
+        self.value = None
+        self.loaded = False
+        self.lock = threading.Lock()
+
+    def get(self):
+        if not self.loaded:
+            with self.lock:
+                if not self.loaded:
+                    self.value = self.factory()
+                    self.loaded = True
+        return self.value
+
+
+def run_warmup(app, tasks: List[Tuple[str, Callable]]):
+    started = time.perf_counter()
+    for name, task in tasks:
+        task_started = time.perf_counter()
+        try:
+            task(app)
+        except Exception as e:
+            # Warm-up is best effort; the same work will be retried on first use
+            print(f"Warm-up task {name} failed: {e}")
+        warmup_timings[name] = time.perf_counter() - task_started
+    print(f"Warm-up finished in {time.perf_counter() - started:.3f}s: {warmup_timings}")
+
+
+def warmup_mode(value: str = STARTUP_WARMUP) -> str:
+    mode = value.strip().lower()
+    if mode not in WARMUP_MODES:
+        print(f"Unknown STARTUP_WARMUP={value!r}, expected one of {', '.join(WARMUP_MODES)}; using blocking")
+        return "blocking"
+    return mode
+
+
+async def _warmup_after_delay(app, tasks: List[Tuple[str, Callable]]):
+    # A fixed delay only; raise STARTUP_WARMUP_DELAY to keep warm-up clear of server startup
+    await asyncio.sleep(STARTUP_WARMUP_DELAY)
+    await asyncio.get_running_loop().run_in_executor(None, run_warmup, app, tasks)
+
+
+def create_lifespan(tasks: List[Tuple[str, Callable]]):
+    @asynccontextmanager
+    async def lifespan(app):
+        warmup = None
+        mode = warmup_mode()
+        if mode == "blocking":
+            run_warmup(app, tasks)
+        elif mode == "background":
+            warmup = asyncio.create_task(_warmup_after_delay(app, tasks))
+        yield
+        if warmup is not None:
+            warmup.cancel()
+
+    return lifespan
@@ -0,0 +1,85 @@
+from datetime import date, datetime, timedelta, timezone
+
+from booking_stats import TrainerBookingStats, align_range
+
+
+def booking(scheduled_at, status="pending", mode="video", trainer_id="t1"):
+    return {
+        "trainer_id": trainer_id,
+        "scheduled_at": scheduled_at,
+        "status": status,
+        "session_mode": mode,
+    }
+
+
+def test_status_change_moves_count_without_changing_total():
+    stats = TrainerBookingStats()
+    moved = booking(datetime(2026, 10, 19, 10))
+    stats.record_created(moved)
+    stats.record_created(booking(datetime(2026, 10, 19, 12), mode="chat"))
+
+    moved["status"] = "rescheduled"
+    stats.record_status_change(moved, "pending")
+
+    [bucket] = stats.query(["t1"], date(2026, 10, 19), date(2026, 10, 19))
+    assert bucket["total"] == 2
+    assert bucket["by_status"] == {"pending": 1, "rescheduled": 1}
+    assert bucket["by_session_mode"] == {"video": 1, "chat": 1}
+
+
+def test_unchanged_status_is_a_no_op():
+    stats = TrainerBookingStats()
+    same = booking(datetime(2026, 10, 19, 10))
+    stats.record_created(same)
+    stats.record_status_change(same, "pending")
+    assert stats.buckets["t1"][date(2026, 10, 19)].counts == {("pending", "video"): 1}
+
+
+def test_empty_bucket_is_removed():
+    stats = TrainerBookingStats()
+    stats._apply("t1", date(2026, 10, 19), "pending", "video", 1)
+    stats._apply("t1", date(2026, 10, 20), "pending", "video", 1)
+    stats._apply("t1", date(2026, 10, 19), "pending", "video", -1)
+
+    assert date(2026, 10, 19) not in stats.buckets["t1"]
+    assert stats.days["t1"] == [date(2026, 10, 20)]
+
+
+def test_range_is_inclusive_at_both_ends():
+    stats = TrainerBookingStats()
+    for day in [18, 19, 25, 26]:
+        stats.record_created(booking(datetime(2026, 10, day, 23, 59)))
+
+    periods = [b["period_start"] for b in stats.query(["t1"], date(2026, 10, 19), date(2026, 10, 25))]
+    assert periods == [date(2026, 10, 19), date(2026, 10, 25)]
+
+
+def test_week_range_covers_whole_edge_weeks():
+    stats = TrainerBookingStats()
+    stats.record_created(booking(datetime(2026, 10, 19, 10)))
+    stats.record_created(booking(datetime(2026, 10, 22, 10)))
+    stats.record_created(booking(datetime(2026, 11, 1, 10)))
+
+    # Wednesday to Wednesday still reports both Monday-Sunday weeks in full
+    assert align_range(date(2026, 10, 21), date(2026, 10, 28), "week") == (date(2026, 10, 19), date(2026, 11, 1))
+    buckets = stats.query(["t1"], date(2026, 10, 21), date(2026, 10, 28), "week")
+    assert [(b["period_start"], b["total"]) for b in buckets] == [
+        (date(2026, 10, 19), 2),
+        (date(2026, 10, 26), 1),
+    ]
+
+
+def test_query_only_counts_requested_trainers():
+    stats = TrainerBookingStats()
+    stats.record_created(booking(datetime(2026, 10, 19, 10)))
+    stats.record_created(booking(datetime(2026, 10, 19, 10), trainer_id="t2"))
+
+    [bucket] = stats.query(["t1"], date(2026, 10, 1), date(2026, 10, 31))
+    assert bucket["total"] == 1
+    assert stats.query(["missing"], date(2026, 10, 1), date(2026, 10, 31)) == []
+
+
+def test_aware_datetimes_are_bucketed_in_utc():
+    stats = TrainerBookingStats()
+    stats.record_created(booking(datetime(2026, 10, 20, 1, tzinfo=timezone(timedelta(hours=5)))))
+    assert stats.days["t1"] == [date(2026, 10, 19)]
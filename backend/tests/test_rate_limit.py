@@ -0,0 +1,240 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from rate_limit import (
+    RULES,
+    ConcurrencyLimiter,
+    InMemoryBackend,
+    LoadSheddingMiddleware,
+    Priority,
+    RateLimiter,
+    RateLimitBackend,
+    RateLimitRule,
+    TrustedProxies,
+    route_priority,
+    safe_ttl,
+)
+
+RULE = RateLimitRule("test", rate=1.0, burst=3)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def consume(backend, key, rule=RULE, peek=False):
+    return asyncio.run(backend.consume(key, rule, peek=peek))
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def backend(clock):
+    return InMemoryBackend(max_keys=100, ttl=600, clock=clock)
+
+
+# Token buckets
+def test_burst_then_limited_with_retry_after(backend):
+    assert [consume(backend, "a")[0] for _ in range(3)] == [True, True, True]
+    allowed, retry_after = consume(backend, "a")
+    assert not allowed
+    assert retry_after == pytest.approx(1.0)
+
+
+def test_refill_over_time(backend, clock):
+    for _ in range(3):
+        consume(backend, "a")
+    clock.now += 0.5
+    allowed, retry_after = consume(backend, "a")
+    assert not allowed
+    assert retry_after == pytest.approx(0.5)
+
+    clock.now += 0.5
+    assert consume(backend, "a")[0]
+
+
+def test_refill_caps_at_burst(backend, clock):
+    consume(backend, "a")
+    clock.now += 100
+    assert [consume(backend, "a")[0] for _ in range(4)] == [True, True, True, False]
+
+
+def test_peek_does_not_spend(backend):
+    for _ in range(5):
+        assert consume(backend, "a", peek=True)[0]
+    assert [consume(backend, "a")[0] for _ in range(4)] == [True, True, True, False]
+    assert not consume(backend, "a", peek=True)[0]
+
+
+def test_keys_are_independent(backend):
+    for _ in range(3):
+        consume(backend, "a")
+    assert not consume(backend, "a")[0]
+    assert consume(backend, "b")[0]
+
+
+# Eviction
+def test_ttl_eviction(backend, clock):
+    consume(backend, "old")
+    clock.now += 601
+    consume(backend, "new")
+    assert "old" not in backend.buckets
+    assert backend.stats() == {"tracked_keys": 1, "evicted": 1}
+
+
+def test_size_eviction_drops_least_recently_used(clock):
+    backend = InMemoryBackend(max_keys=2, ttl=600, clock=clock)
+    consume(backend, "a")
+    consume(backend, "b")
+    consume(backend, "a")
+    consume(backend, "c")
+    assert list(backend.buckets) == ["a", "c"]
+    assert backend.evicted == 1
+
+
+def test_safe_ttl_clamps_to_longest_refill():
+    longest = max(rule.burst / rule.rate for rule in RULES)
+    assert safe_ttl(1) == pytest.approx(longest)
+    assert safe_ttl(longest * 2) == longest * 2
+    assert safe_ttl(1, [RateLimitRule("r", rate=0.5, burst=10)]) == 20
+    assert InMemoryBackend(ttl=1).ttl == pytest.approx(longest)
+
+
+# RateLimiter
+def test_limiter_counts_hits():
+    limiter = RateLimiter(InMemoryBackend(ttl=600))
+    for _ in range(4):
+        asyncio.run(limiter.hit(RULE, "user"))
+    stats = limiter.stats()
+    assert stats["allowed"] == {"test": 3}
+    assert stats["limited"] == {"test": 1}
+
+
+def test_limiter_fails_open_on_backend_error():
+    class Broken(RateLimitBackend):
+        async def consume(self, *args, **kwargs):
+            raise ConnectionError("down")
+
+    limiter = RateLimiter(Broken())
+    assert asyncio.run(limiter.hit(RULE, "user")) == (True, 0.0)
+    assert asyncio.run(limiter.hit(RULE, "user")) == (True, 0.0)
+    assert limiter.counters.backend_errors == 2
+
+
+# Client address
+def connection(peer, forwarded=None):
+    headers = {"x-forwarded-for": forwarded} if forwarded else {}
+    return SimpleNamespace(client=SimpleNamespace(host=peer), headers=headers)
+
+
+def test_untrusted_peer_ignores_forwarded_header():
+    proxies = TrustedProxies("10.0.0.0/8")
+    assert proxies.client_ip(connection("203.0.113.5", "1.2.3.4")) == "203.0.113.5"
+    assert TrustedProxies("").client_ip(connection("10.0.0.1", "1.2.3.4")) == "10.0.0.1"
+
+
+def test_trusted_peer_uses_first_untrusted_hop_from_right():
+    proxies = TrustedProxies("10.0.0.0/8, 192.168.1.1")
+    conn = connection("10.0.0.1", "6.6.6.6, 5.5.5.5, 192.168.1.1, 10.0.0.2")
+    assert proxies.client_ip(conn) == "5.5.5.5"
+
+
+def test_trusted_peer_without_header():
+    assert TrustedProxies("10.0.0.0/8").client_ip(connection("10.0.0.1")) == "10.0.0.1"
+
+
+def test_all_trusted_chain_falls_back_to_leftmost():
+    proxies = TrustedProxies("10.0.0.0/8")
+    assert proxies.client_ip(connection("10.0.0.1", "10.0.0.3, 10.0.0.2")) == "10.0.0.3"
+
+
+def test_wildcard_trusts_only_immediate_peer():
+    proxies = TrustedProxies("*")
+    assert proxies.client_ip(connection("172.16.0.9", "6.6.6.6, 5.5.5.5")) == "5.5.5.5"
+
+
+def test_garbage_hops_are_treated_as_untrusted():
+    proxies = TrustedProxies("10.0.0.0/8")
+    assert proxies.client_ip(connection("10.0.0.1", "1.1.1.1, unknown")) == "unknown"
+
+
+# Load shedding
+def test_route_priorities():
+    assert route_priority("/api/v1/emergency/notify") == Priority.CRITICAL
+    assert route_priority("/api/v1/bookings/create") == Priority.CRITICAL
+    assert route_priority("/api/v1/trainers/list") == Priority.LOW
+    assert route_priority("/api/v1/ai/recommendations") == Priority.LOW
+    assert route_priority("/api/v1/auth/me") == Priority.NORMAL
+
+
+def test_low_priority_shed_first():
+    limiter = ConcurrencyLimiter(max_concurrent=10)
+    assert all(limiter.try_acquire(Priority.LOW) for _ in range(5))
+    assert not limiter.try_acquire(Priority.LOW)
+    assert all(limiter.try_acquire(Priority.NORMAL) for _ in range(3))
+    assert not limiter.try_acquire(Priority.NORMAL)
+    assert all(limiter.try_acquire(Priority.CRITICAL) for _ in range(2))
+    assert not limiter.try_acquire(Priority.CRITICAL)
+
+    stats = limiter.stats()
+    assert stats["in_flight"] == 10
+    assert stats["shed"] == {"low": 1, "normal": 1, "critical": 1}
+
+    limiter.release()
+    assert limiter.try_acquire(Priority.CRITICAL)
+
+
+def run_middleware(middleware, path):
+    sent = []
+    scope = {"type": "http", "path": path}
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(middleware(scope, receive, send))
+    return sent
+
+
+def test_middleware_returns_503_when_shedding():
+    calls = []
+
+    async def app(scope, receive, send):
+        calls.append(scope["path"])
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    limiter = ConcurrencyLimiter(max_concurrent=10)
+    limiter.in_flight = limiter.limits[Priority.LOW]
+    middleware = LoadSheddingMiddleware(app, limiter)
+
+    shed = run_middleware(middleware, "/api/v1/trainers/list")
+    assert shed[0]["status"] == 503
+    assert (b"retry-after", b"1") in shed[0]["headers"]
+    assert calls == []
+
+    admitted = run_middleware(middleware, "/api/v1/emergency/notify")
+    assert admitted[0]["status"] == 200
+    assert calls == ["/api/v1/emergency/notify"]
+    assert limiter.in_flight == limiter.limits[Priority.LOW]
+
+
+def test_middleware_releases_slot_on_error():
+    async def app(scope, receive, send):
+        raise RuntimeError("boom")
+
+    limiter = ConcurrencyLimiter(max_concurrent=10)
+    with pytest.raises(RuntimeError):
+        run_middleware(LoadSheddingMiddleware(app, limiter), "/api/v1/auth/me")
+    assert limiter.in_flight == 0